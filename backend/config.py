@@ -3,7 +3,10 @@
 import os
 from dotenv import load_dotenv
 
-load_dotenv()
+# Only read .env once per process (re-imports and reloads inherit the environment)
+if not os.environ.get("_LLMCOUNCIL_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_LLMCOUNCIL_DOTENV_LOADED"] = "1"
 
 # DeepSeek and Moonshot (Kimi) API keys
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
@@ -22,5 +25,9 @@ CHAIRMAN_MODEL = "deepseek-chat"
 DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
 MOONSHOT_API_URL = "https://api.moonshot.cn/v1/chat/completions"
 
+# Maximum in-flight requests per provider, to stay under provider rate limits
+DEEPSEEK_MAX_CONCURRENCY = 16
+MOONSHOT_MAX_CONCURRENCY = 8
+
 # Data directory for conversation storage
 DATA_DIR = "data/conversations"
@@ -8,11 +8,21 @@ from typing import List, Dict, Any
 import uuid
 import json
 import asyncio
+from contextlib import asynccontextmanager
 
 from . import storage
+from . import openrouter
 from .council import run_full_council, generate_conversation_title, stage1_collect_responses, stage2_collect_rankings, stage3_synthesize_final, calculate_aggregate_rankings
 
-app = FastAPI(title="LLM Council API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release the shared provider HTTP client on shutdown."""
+    yield
+    await openrouter.aclose()
+
+
+app = FastAPI(title="LLM Council API", lifespan=lifespan)
 
 # Enable CORS for local development
 app.add_middleware(
@@ -1,14 +1,132 @@
 """Direct provider API client for DeepSeek and Moonshot (Kimi)."""
 
+import asyncio
+import logging
+
 import httpx
-from typing import List, Dict, Any, Optional
+import orjson
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 from .config import (
     DEEPSEEK_API_KEY,
     MOONSHOT_API_KEY,
     DEEPSEEK_API_URL,
     MOONSHOT_API_URL,
+    DEEPSEEK_MAX_CONCURRENCY,
+    MOONSHOT_MAX_CONCURRENCY,
 )
 
+logger = logging.getLogger(__name__)
+
+# Failures that make a single model query return None instead of raising:
+# transport/HTTP errors and malformed (non-JSON or unexpectedly shaped) payloads
+_QUERY_ERRORS = (
+    httpx.HTTPError,
+    orjson.JSONDecodeError,
+    KeyError,
+    IndexError,
+    TypeError,
+    AttributeError,
+)
+
+
+def _auth_headers(api_key: str) -> Dict[str, str]:
+    """Build the request headers for a provider, once at import time."""
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+
+# Model identifier prefix -> (request headers, endpoint URL, max in-flight requests).
+# Providers without an API key are left out, so their models fail fast.
+_PROVIDERS: Dict[str, Tuple[Dict[str, str], str, int]] = {}
+
+if DEEPSEEK_API_KEY:
+    _PROVIDERS["deepseek"] = (
+        _auth_headers(DEEPSEEK_API_KEY),
+        DEEPSEEK_API_URL,
+        DEEPSEEK_MAX_CONCURRENCY,
+    )
+
+if MOONSHOT_API_KEY:
+    _moonshot = (
+        _auth_headers(MOONSHOT_API_KEY),
+        MOONSHOT_API_URL,
+        MOONSHOT_MAX_CONCURRENCY,
+    )
+    _PROVIDERS["moonshot"] = _moonshot
+    _PROVIDERS["kimi"] = _moonshot
+
+
+@lru_cache(maxsize=256)
+def _resolve_provider(model: str) -> Optional[Tuple[Dict[str, str], str, int]]:
+    """Map a model identifier to its (headers, endpoint URL, concurrency limit), or None if not configured."""
+    return _PROVIDERS.get(model.partition("-")[0].lower())
+
+
+# Shared client so repeated queries reuse pooled keep-alive connections, plus
+# per-endpoint semaphores bounding in-flight requests. HTTP/2 lets concurrent
+# council queries to the same host share one connection.
+# Both are tied to the event loop that created them, so they are rebuilt when
+# used from a different loop (e.g. a second asyncio.run() in a script or test).
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[httpx.AsyncClient] = None
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def _bind_to_running_loop() -> None:
+    """Create the client and semaphores for the running loop if not already bound to it."""
+    global _loop, _client, _semaphores
+    loop = asyncio.get_running_loop()
+    if loop is not _loop:
+        _loop = loop
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0),
+            http2=True,
+            limits=httpx.Limits(
+                max_keepalive_connections=64,
+                max_connections=64,
+                keepalive_expiry=60,
+            ),
+        )
+        _semaphores = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client for the running event loop."""
+    _bind_to_running_loop()
+    return _client
+
+
+def _get_semaphore(api_url: str, limit: int) -> asyncio.Semaphore:
+    """Return the semaphore bounding in-flight requests to an endpoint on the running loop."""
+    _bind_to_running_loop()
+    semaphore = _semaphores.get(api_url)
+    if semaphore is None:
+        semaphore = _semaphores[api_url] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+async def aclose() -> None:
+    """Close the shared HTTP client. Call this on application shutdown."""
+    global _loop, _client, _semaphores
+    if _client is not None:
+        client = _client
+        _loop, _client, _semaphores = None, None, {}
+        await client.aclose()
+
+
+def _first_choice_field(data: Any, field: str) -> Optional[Dict[str, Any]]:
+    """Return choices[0][field] from a completion payload if it is a dict, else None."""
+    if not isinstance(data, dict):
+        return None
+    choices = data.get('choices')
+    if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+        return None
+    value = choices[0].get(field)
+    return value if isinstance(value, dict) else None
+
 
 async def query_model(
     model: str,
@@ -24,23 +142,15 @@ async def query_model(
         timeout: Request timeout in seconds
 
     Returns:
-        Response dict with 'content' and optional 'reasoning_details', or None if failed
+        Response dict with 'content' and optional 'reasoning_details', or None if
+        the provider is not configured, the request fails, or the response is malformed
     """
-    # Select provider based on model prefix
-    if model.startswith("deepseek"):
-        api_key = DEEPSEEK_API_KEY
-        api_url = DEEPSEEK_API_URL
-    elif model.startswith("moonshot"):
-        api_key = MOONSHOT_API_KEY
-        api_url = MOONSHOT_API_URL
-    else:
-        print(f"Unsupported model provider for '{model}'")
+    # Select provider based on model prefix (e.g. "deepseek-chat" -> "deepseek")
+    provider = _resolve_provider(model)
+    if provider is None:
+        logger.warning("No configured provider for model '%s'", model)
         return None
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
+    headers, api_url, max_concurrency = provider
 
     payload = {
         "model": model,
@@ -48,27 +158,96 @@ async def query_model(
     }
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
+        async with _get_semaphore(api_url, max_concurrency):
+            response = await get_client().post(
                 api_url,
                 headers=headers,
-                json=payload
+                content=orjson.dumps(payload),
+                timeout=timeout
             )
-            response.raise_for_status()
+        response.raise_for_status()
 
-            data = response.json()
-            message = data['choices'][0]['message']
+        message = _first_choice_field(orjson.loads(response.content), 'message')
+        if not message:
+            logger.warning("Malformed response from model %s: no message", model)
+            return None
 
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')
-            }
+        return {
+            'content': message.get('content'),
+            'reasoning_details': message.get('reasoning_details')
+        }
 
-    except Exception as e:
-        print(f"Error querying model {model}: {e}")
+    except _QUERY_ERRORS as e:
+        logger.warning("Error querying model %s: %s", model, e)
         return None
 
 
+async def stream_model(
+    model: str,
+    messages: List[Dict[str, str]],
+    timeout: float = 120.0
+) -> AsyncIterator[str]:
+    """
+    Query a single model and yield its answer incrementally as it is generated.
+
+    Args:
+        model: Model identifier (e.g., "deepseek-chat")
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Request timeout in seconds
+
+    Yields:
+        Content deltas as they arrive; yields nothing if the request fails before
+        any content is received
+
+    Raises:
+        The underlying error (see _QUERY_ERRORS) if the stream fails after some
+        content has been yielded, so a truncated answer is not mistaken for a
+        complete one
+    """
+    provider = _resolve_provider(model)
+    if provider is None:
+        logger.warning("No configured provider for model '%s'", model)
+        return
+    headers, api_url, max_concurrency = provider
+
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": True,
+    }
+
+    received_content = False
+    try:
+        async with _get_semaphore(api_url, max_concurrency):
+            async with get_client().stream(
+                "POST",
+                api_url,
+                headers=headers,
+                content=orjson.dumps(payload),
+                timeout=timeout
+            ) as response:
+                response.raise_for_status()
+
+                # Server-sent events: "data: {...}" lines, terminated by "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+
+                    delta = _first_choice_field(orjson.loads(data), 'delta')
+                    content = delta.get('content') if delta else None
+                    if content:
+                        received_content = True
+                        yield content
+
+    except _QUERY_ERRORS as e:
+        logger.warning("Error streaming model %s: %s", model, e)
+        if received_content:
+            raise
+
+
 async def query_models_parallel(
     models: List[str],
     messages: List[Dict[str, str]]
@@ -83,13 +262,77 @@ async def query_models_parallel(
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    import asyncio
+    # Query each distinct model once, even if it is listed more than once
+    unique_models = list(dict.fromkeys(models))
 
     # Create tasks for all models
-    tasks = [query_model(model, messages) for model in models]
+    tasks = [query_model(model, messages) for model in unique_models]
 
-    # Wait for all to complete
-    responses = await asyncio.gather(*tasks)
+    # Wait for all to complete; an unexpected error only fails its own model
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
 
     # Map models to their responses
-    return {model: response for model, response in zip(models, responses)}
+    results = {}
+    for model, response in zip(unique_models, responses):
+        if isinstance(response, BaseException):
+            if isinstance(response, asyncio.CancelledError):
+                raise response
+            logger.warning("Error querying model %s: %s", model, response)
+            response = None
+        results[model] = response
+    return results
+
+
+async def query_models_quorum(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    k: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Query multiple models in parallel, returning as soon as k have succeeded.
+
+    Outstanding queries are cancelled once the quorum is reached.
+
+    Args:
+        models: List of model identifiers
+        messages: List of message dicts to send to each model
+        k: Number of successful responses to wait for
+
+    Returns:
+        Dict mapping model identifier to response dict for the first k successes
+        (fewer if not enough models succeed; empty if k <= 0)
+
+    Raises:
+        ValueError: If k is larger than the number of distinct models
+    """
+    unique_models = list(dict.fromkeys(models))
+    if k > len(unique_models):
+        raise ValueError(f"Quorum of {k} exceeds the {len(unique_models)} distinct models given")
+    if k <= 0:
+        return {}
+
+    async def tagged_query(model: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        # As in query_models_parallel, an unexpected error only fails its own model
+        try:
+            return model, await query_model(model, messages)
+        except Exception as e:
+            logger.warning("Error querying model %s: %s", model, e)
+            return model, None
+
+    tasks = [asyncio.create_task(tagged_query(model)) for model in unique_models]
+
+    results = {}
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            model, response = await next_done
+            if response is not None:
+                results[model] = response
+                if len(results) >= k:
+                    break
+    finally:
+        # Cancel any queries still in flight
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return results